@@ -1,9 +1,14 @@
 import streamlit as st
 from data_loader import cargar_datos, procesar_datos
+from reporte import (
+    aplicar_filtros, construir_filtros, construir_reporte, figura_pie, figura_scatter_categorica,
+    normalizar_rango_fecha, obtener_opciones_filtro, preparar_datos_pestanas,
+)
+from snapshot import cargar_filtros, cargar_reporte, guardar_snapshot, hash_contenido, hash_filtros, version_app
 import pandas as pd
-from typing import Optional
-import numpy as np
-from datetime import timedelta
+import plotly.graph_objects as go
+from io import BytesIO
+from typing import Any, Callable, Dict, Optional
 
 # =============================
 # Configuración de la aplicación
@@ -13,80 +18,55 @@ st.set_page_config(page_title="Visualizador de Pozos", layout="wide")
 st.title("Visualizador de Pozos de Tronadura")
 
 # =============================
-# Sidebar para carga de datos
+# Funciones de UI
 # =============================
-with st.sidebar:
-    st.header("Cargar datos")
-    archivo: Optional[object] = st.file_uploader("Subir archivo Excel", type=["xlsx"])
-
-if archivo is not None:
-    try:
-        # Cargar y procesar datos
-        df = cargar_datos(archivo)
-        df_procesado = procesar_datos(df)
-        # df_procesado = convertir_coordenadas(df_procesado)  # Eliminada conversión a lat/lon
-    except Exception as e:
-        st.error(f"Error al cargar o procesar el archivo: {e}")
-        st.stop()
-
-    # Validar existencia de columnas UTM
-    columnas_utm = ["este", "norte"]
-    for col in columnas_utm:
-        if col not in df_procesado.columns:
-            st.error(f"La columna '{col}' no está presente en los datos procesados.")
-            st.stop()
-
-    # =============================
-    # Filtros dinámicos y de fecha
-    # =============================
+def renderizar_filtros(filtros: Dict[str, Any], obtener_df: Callable[[], pd.DataFrame]) -> Dict[str, Any]:
+    """
+    Dibuja los filtros del sidebar y devuelve la selección del usuario.
+    Mientras la selección sea la por defecto se usan las opciones guardadas en `filtros`;
+    al apartarse de ella las opciones se recalculan sobre los datos filtrados.
+    Args:
+        filtros: Definición de filtros (ver reporte.construir_filtros).
+        obtener_df: Devuelve el DataFrame procesado; solo se invoca si hace falta.
+    Returns:
+        Selección con 'fecha_tronadura' y los valores elegidos por columna.
+    """
     st.sidebar.subheader("Filtros de columnas")
-    # Excluir solo columnas técnicas (coordenadas y fecha)
-    columnas_excluir = [
-        "x", "y", "z", "holes_dateupdated", "camion", "longitud_teo", "uniqid", "fecha_tronadura",
-        "numero", "id_pozo", "este", "norte", "kilos_cargados_real", "nombre", "inclinacion_real", "azimuth_real", "diametro", "stemming_real", "water_level", "number_primes"
-    ]
-    columnas_filtrables = [col for col in df_procesado.columns if df_procesado[col].nunique() > 1 and col.lower() not in columnas_excluir]
+    seleccion: Dict[str, Any] = {}
 
     # Filtro de fecha con calendario independiente
-    if "fecha_tronadura" in df_procesado.columns:
-        fechas_validas = df_procesado["fecha_tronadura"].dropna().dt.date
-        if not fechas_validas.empty:
-            min_fecha = fechas_validas.min()
-            max_fecha = fechas_validas.max()
-            if min_fecha != max_fecha:
-                limite_inferior = max(min_fecha, max_fecha - timedelta(days=30))
-                rango_defecto = (limite_inferior, max_fecha)
-            else:
-                rango_defecto = min_fecha
-            rango_fecha = st.sidebar.date_input(
-                "Filtrar por fecha de tronadura (selecciona una o un rango)",
-                value=rango_defecto,
-                min_value=min_fecha,
-                max_value=max_fecha
-            )
-            if isinstance(rango_fecha, tuple) and len(rango_fecha) == 2:
-                df_procesado = df_procesado[(df_procesado["fecha_tronadura"].dt.date >= rango_fecha[0]) & (df_procesado["fecha_tronadura"].dt.date <= rango_fecha[1])]
-            elif isinstance(rango_fecha, (str, pd.Timestamp)) or rango_fecha:
-                df_procesado = df_procesado[df_procesado["fecha_tronadura"].dt.date == rango_fecha]
-            st.sidebar.caption("Se muestran por defecto los últimos 30 días de datos disponibles.")
+    fecha = filtros["fecha"]
+    if fecha is not None:
+        defecto = fecha["defecto"]
+        rango_fecha = st.sidebar.date_input(
+            "Filtrar por fecha de tronadura (selecciona una o un rango)",
+            value=tuple(defecto) if len(defecto) == 2 else defecto[0],
+            min_value=fecha["min"],
+            max_value=fecha["max"]
+        )
+        seleccion["fecha_tronadura"] = normalizar_rango_fecha(rango_fecha)
+        st.sidebar.caption("Se muestran por defecto los últimos 30 días de datos disponibles.")
 
     # Filtros multiselección para todas las columnas (excepto coordenadas y fecha)
-    for col in columnas_filtrables:
-        valores = df_procesado[col].dropna().unique()
+    for col in filtros["columnas"]:
+        if seleccion == filtros["seleccion_defecto"]:
+            valores = filtros["opciones"][col]
+        else:
+            valores = obtener_opciones_filtro(aplicar_filtros(obtener_df(), seleccion), col)
         if len(valores) > 1:
-            selected = st.sidebar.multiselect(f"{col}", sorted(valores), default=[])
+            selected = st.sidebar.multiselect(f"{col}", valores, default=[])
             if selected:
-                df_procesado = df_procesado[df_procesado[col].isin(selected)]
-
-    # =============================
-    # Calcular factor de carga (kg/m)
-    # =============================
-    if "kilos_cargados_real" in df_procesado.columns and "longitud_real" in df_procesado.columns:
-        df_procesado["factor_carga"] = df_procesado["kilos_cargados_real"] / df_procesado["longitud_real"]
-        df_procesado["factor_carga"].replace([np.inf, -np.inf], np.nan, inplace=True)
-    elif "factor_carga" in df_procesado.columns:
-        df_procesado["factor_carga"] = pd.to_numeric(df_procesado["factor_carga"], errors="coerce")
-
+                seleccion[col] = selected
+    return seleccion
+
+def renderizar_reporte(reporte: Dict[str, Any], obtener_df_pestanas: Callable[[], pd.DataFrame]) -> None:
+    """
+    Dibuja el reporte calculado por reporte.construir_reporte (recién calculado o desde snapshot).
+    Args:
+        reporte: Contenido del reporte.
+        obtener_df_pestanas: Devuelve los datos de las pestañas; solo se invoca si el usuario
+            elige en un selector una columna que no viene pre-renderizada.
+    """
     st.markdown("""
     **Factor de carga (kg/m):**
     Se calcula como `kilos_cargados_real / longitud_real` para cada pozo.
@@ -95,119 +75,13 @@ if archivo is not None:
     # Visualización de datos
     # =============================
     st.subheader("Datos de Pozos")
-    # Redondear todos los campos numéricos a 2 decimales para visualización y hover
-    df_vista = df_procesado.copy()
-    for col in df_vista.select_dtypes(include=[float, int]).columns:
-        df_vista[col] = df_vista[col].round(2)
-    st.dataframe(df_vista.head())
+    st.dataframe(reporte["vista_previa"])
 
     # =============================
     # Visualización en plano UTM (Plotly para hover personalizado)
     # =============================
-    import plotly.express as px
     st.subheader("Pozos en Coordenadas UTM (Este vs Norte)")
-    # Definir las columnas informativas para el hover
-    # Preparar columna de diámetro en pulgadas para el hover
-    from fractions import Fraction
-
-    def pulgadas_a_mixto(valor):
-        if pd.isna(valor):
-            return ""
-        try:
-            valor_float = float(valor)
-        except (TypeError, ValueError):
-            return ""
-        entero = int(valor_float)
-        fraccion = round(valor_float - entero, 6)
-        if fraccion < 0:
-            fraccion = 0
-        fraccion_str = ""
-        if fraccion > 0:
-            frac = Fraction(fraccion).limit_denominator(16)
-            if frac.numerator != 0:
-                fraccion_str = f" {frac.numerator}/{frac.denominator}"
-        return f"{entero}{fraccion_str}" if fraccion_str or fraccion == 0 else f"{valor_float:.2f}"
-
-    def agregar_diametro_pulgadas(df: pd.DataFrame) -> pd.DataFrame:
-        if "diametro" not in df.columns:
-            return df
-        df = df.copy()
-        df["diametro"] = pd.to_numeric(df["diametro"], errors="coerce")
-        df["diametro_pulgadas"] = df["diametro"] / 25.4
-        df["diametro_pulgadas_str"] = df["diametro_pulgadas"].apply(pulgadas_a_mixto)
-        return df
-
-    def preparar_columnas_aux(df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        df = agregar_diametro_pulgadas(df)
-        # Redondear todos los campos numéricos a 2 decimales
-        for col in df.select_dtypes(include=[float, int]).columns:
-            df[col] = df[col].round(2)
-        if "fecha_tronadura" in df.columns and "fecha_tronadura_str" not in df.columns:
-            df["fecha_tronadura_str"] = df["fecha_tronadura"].dt.strftime("%d-%m-%Y")
-        return df
-
-    def aplicar_estilo_figura(fig, scatter_xy: bool = False, is_3d: bool = False):
-        fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
-        if scatter_xy:
-            fig.update_xaxes(showgrid=False, zeroline=False)
-            fig.update_yaxes(showgrid=False, zeroline=False, scaleanchor="x", scaleratio=1)
-        if is_3d:
-            fig.update_layout(
-                scene=dict(
-                    xaxis=dict(showbackground=False, showgrid=False, zeroline=False),
-                    yaxis=dict(showbackground=False, showgrid=False, zeroline=False),
-                    zaxis=dict(showbackground=False, showgrid=False, zeroline=False),
-                )
-            )
-
-    # Función auxiliar para generar campos y etiquetas de hover
-    def obtener_hover(df):
-        campos = []
-        etiquetas = {}
-        if "numero" in df.columns:
-            campos.append("numero"); etiquetas["numero"] = "Pozo"
-        if "nombre_banco" in df.columns:
-            campos.append("nombre_banco"); etiquetas["nombre_banco"] = "Banco"
-        if "kilos_cargados_real" in df.columns:
-            campos.append("kilos_cargados_real"); etiquetas["kilos_cargados_real"] = "Kg"
-        if "longitud_real" in df.columns:
-            campos.append("longitud_real"); etiquetas["longitud_real"] = "L(m)"
-        if "factor_carga" in df.columns:
-            campos.append("factor_carga"); etiquetas["factor_carga"] = "FC"
-        if "fecha_tronadura" in df.columns and "fecha_tronadura_str" in df.columns:
-            campos.append("fecha_tronadura_str"); etiquetas["fecha_tronadura_str"] = "Fecha"
-        if "holes_polygon" in df.columns:
-            campos.append("holes_polygon"); etiquetas["holes_polygon"] = "Malla"
-        if "diametro_pulgadas_str" in df.columns:
-            campos.append("diametro_pulgadas_str"); etiquetas["diametro_pulgadas_str"] = "Ø (pulg)"
-        return campos, etiquetas
-
-    df_vista = preparar_columnas_aux(df_vista)
-    campos_hover, etiquetas = obtener_hover(df_vista)
-    custom_data = campos_hover
-    hovertemplate = "<br>".join([
-        f"{etiquetas[campo]}: <b>%{{customdata[{i}]}}</b>" for i, campo in enumerate(campos_hover)
-    ]) + "<extra></extra>"
-
-    color_col = None
-    color_scale = None
-    if "kilos_cargados_real" in df_vista.columns:
-        color_col = "kilos_cargados_real"
-        color_scale = "RdYlGn_r"  # Escala verde (bajo) a rojo (alto)
-    fig = px.scatter(
-        df_vista,
-        x="este",
-        y="norte",
-        color=color_col,
-        color_continuous_scale=color_scale if color_scale else None,
-        custom_data=custom_data,
-        title="Mapa de calor de pozos según kilos de explosivo",
-        labels={"este": "Este (X)", "norte": "Norte (Y)", "kilos_cargados_real": "Kg Explosivo"}
-    )
-    fig.update_traces(hovertemplate=hovertemplate)
-    aplicar_estilo_figura(fig, scatter_xy=True)
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(reporte["fig_utm"], use_container_width=True)
 
     # =============================
     # Sección Geotecnia: Métricas para estabilidad de taludes
@@ -215,222 +89,96 @@ if archivo is not None:
     st.header("Análisis Geotécnico para Estabilidad de Taludes")
 
     # 1. Uniformidad del factor de carga (kg/m)
-    if "factor_carga" in df_procesado.columns:
+    factor = reporte["factor_carga"]
+    if factor is not None:
         st.subheader("Uniformidad del factor de carga (kg/m)")
-        df_factor = df_procesado.copy()
-        df_factor["factor_carga"] = pd.to_numeric(df_factor["factor_carga"], errors="coerce")
-        df_factor = df_factor[df_factor["factor_carga"].notnull() & df_factor["factor_carga"].apply(lambda x: x != float('inf') and x != float('-inf'))]
-        if not df_factor.empty:
-            # Estadísticos
+        if not factor["vacio"]:
             st.markdown("**Estadísticos del factor de carga:**")
-            st.write(df_factor["factor_carga"].describe()[["mean","std","min","max"]].rename({"mean":"Media","std":"Desv.Est.","min":"Mínimo","max":"Máximo"}))
+            st.write(factor["estadisticos"])
             st.markdown("- Un bajo desvío estándar indica buena uniformidad de carga, importante para evitar sobre-excavación o zonas débiles en el talud.")
-            # Scatter espacial: distribución del factor de carga (mapa de calor)
             st.markdown("**Distribución espacial del factor de carga (kg/m):**")
-            df_factor = preparar_columnas_aux(df_factor)
-            campos_hover_factor, etiquetas_factor = obtener_hover(df_factor)
-            custom_data_factor = campos_hover_factor
-            hovertemplate_factor = "<br>".join([
-                f"{etiquetas_factor[campo]}: <b>%{{customdata[{i}]}}</b>" for i, campo in enumerate(campos_hover_factor)
-            ]) + "<extra></extra>"
-            fig_factor = px.scatter(
-                df_factor,
-                x="este",
-                y="norte",
-                color="factor_carga",
-                size="factor_carga",
-                size_max=15,
-                color_continuous_scale="RdYlGn_r",
-                custom_data=custom_data_factor,
-                title="Mapa de calor espacial del factor de carga (kg/m)",
-                labels={"este": "Este (X)", "norte": "Norte (Y)", "factor_carga": "Factor de carga (kg/m)"}
-            )
-            fig_factor.update_traces(hovertemplate=hovertemplate_factor)
-            aplicar_estilo_figura(fig_factor, scatter_xy=True)
-            st.plotly_chart(fig_factor, use_container_width=True)
+            st.plotly_chart(factor["fig_tamano"], use_container_width=True)
             st.markdown("- Este gráfico muestra la variación espacial del factor de carga en el área de tronadura, permitiendo detectar zonas con sobrecarga o subcarga.")
-            if df_factor["factor_carga"].nunique() <= 1:
+            if factor["uniforme"]:
                 st.info("Todos los pozos tienen el mismo factor de carga. El color será uniforme.")
-            # Mapa de calor
-            df_factor = preparar_columnas_aux(df_factor)
-            campos_hover_factor, etiquetas_factor = obtener_hover(df_factor)
-            custom_data_factor = campos_hover_factor
-            hovertemplate_factor = "<br>".join([
-                f"{etiquetas_factor[campo]}: <b>%{{customdata[{i}]}}</b>" for i, campo in enumerate(campos_hover_factor)
-            ]) + "<extra></extra>"
-            fig_factor = px.scatter(
-                df_factor,
-                x="este",
-                y="norte",
-                color="factor_carga",
-                color_continuous_scale="RdYlGn_r",
-                custom_data=custom_data_factor,
-                title="Mapa de calor de pozos según factor de carga (kg/m)",
-                labels={"este": "Este (X)", "norte": "Norte (Y)", "factor_carga": "Factor de carga (kg/m)"}
-            )
-            fig_factor.update_traces(hovertemplate=hovertemplate_factor)
-            aplicar_estilo_figura(fig_factor, scatter_xy=True)
-            st.plotly_chart(fig_factor, use_container_width=True)
-            if df_factor["factor_carga"].nunique() <= 1:
+            st.plotly_chart(factor["fig_calor"], use_container_width=True)
+            if factor["uniforme"]:
                 st.info("Todos los pozos tienen el mismo factor de carga. El color será uniforme.")
         else:
             st.info("No hay datos válidos de factor de carga para graficar.")
 
     # 2. Longitud real vs teórica de pozos
-    if "longitud_real" in df_procesado.columns and "longitud_teo" in df_procesado.columns:
+    longitud = reporte["longitud"]
+    if longitud is not None:
         st.subheader("Control de longitud real vs teórica de pozos")
-        df_long = df_procesado[["numero","longitud_real","longitud_teo","este","norte"]].copy()
-        df_long = df_long[df_long["longitud_real"].notnull() & df_long["longitud_teo"].notnull()]
-        df_long = preparar_columnas_aux(df_long)
-        # Cálculo de desviación relativa (%)
-        df_long["desviacion_%"] = 100 * (df_long["longitud_real"] - df_long["longitud_teo"]) / df_long["longitud_teo"]
-        # Estadísticos
         st.markdown("**Estadísticos de longitud real:**")
-        st.write(df_long["longitud_real"].describe()[["mean","std","min","max"]].rename({"mean":"Media","std":"Desv.Est.","min":"Mínimo","max":"Máximo"}))
-        st.markdown("**Desviación estándar de longitud real:** " + f"{df_long['longitud_real'].std():.2f} m")
-        # Clasificación de pozos
-        df_long["clasificacion"] = "Dentro de tolerancia"
-        df_long.loc[df_long["desviacion_%"] < -5, "clasificacion"] = "Sub-perforado (<-5%)"
-        df_long.loc[df_long["desviacion_%"] > 5, "clasificacion"] = "Sobre-perforado (>+5%)"
-        total_pozos = len(df_long)
-        n_sub = (df_long["clasificacion"] == "Sub-perforado (<-5%)").sum()
-        n_sobre = (df_long["clasificacion"] == "Sobre-perforado (>+5%)").sum()
-        st.markdown(f"- **% Sub-perforados:** {100*n_sub/total_pozos:.1f}%  ")
-        st.markdown(f"- **% Sobre-perforados:** {100*n_sobre/total_pozos:.1f}%  ")
-        # Visualización
-        fig_long = px.scatter(
-            df_long,
-            x="este",
-            y="norte",
-            color="clasificacion",
-            custom_data=["numero","longitud_real","longitud_teo","desviacion_%","clasificacion"],
-            title="Distribución espacial de pozos según desviación de longitud",
-            labels={"este": "Este (X)", "norte": "Norte (Y)", "clasificacion": "Clasificación"}
-        )
-        fig_long.update_traces(hovertemplate="Pozo: <b>%{customdata[0]}</b><br>Long. real: <b>%{customdata[1]} m</b><br>Long. teórica: <b>%{customdata[2]} m</b><br>Desviación: <b>%{customdata[3]:.2f}%</b><br>Estado: <b>%{customdata[4]}</b><extra></extra>")
-        aplicar_estilo_figura(fig_long, scatter_xy=True)
-        st.plotly_chart(fig_long, use_container_width=True)
+        st.write(longitud["estadisticos"])
+        st.markdown("**Desviación estándar de longitud real:** " + f"{longitud['desviacion_std']:.2f} m")
+        st.markdown(f"- **% Sub-perforados:** {longitud['pct_sub']:.1f}%  ")
+        st.markdown(f"- **% Sobre-perforados:** {longitud['pct_sobre']:.1f}%  ")
+        st.plotly_chart(longitud["fig"], use_container_width=True)
 
     # 6. Variabilidad de diámetro de pozos
-    if "diametro" in df_procesado.columns:
+    diametro = reporte["diametro"]
+    if diametro is not None:
         st.subheader("Variabilidad de diámetro de pozos")
-        df_var = df_procesado[["numero","este","norte","diametro"]].copy()
-        df_var = preparar_columnas_aux(df_var)
         st.markdown("**Estadísticos de diámetro:**")
-        st.write(df_var["diametro"].describe()[["mean","std","min","max"]].rename({"mean":"Media","std":"Desv.Est.","min":"Mínimo","max":"Máximo"}))
-        # Definir tolerancia (ejemplo: diámetro ±3mm)
-        tolerancia_diam = 3
-        nominal = df_var["diametro"].mode()[0] if not df_var["diametro"].mode().empty else df_var["diametro"].mean()
-        df_var["diametro_fuera_tol"] = abs(df_var["diametro"] - nominal) > tolerancia_diam
-        pct_fuera = 100 * df_var["diametro_fuera_tol"].sum() / len(df_var)
-        st.markdown(f"- **% pozos fuera de tolerancia de diámetro (±{tolerancia_diam} mm):** {pct_fuera:.1f}%")
-        # Visualización espacial
-        fig_diam = px.scatter(
-            df_var,
-            x="este",
-            y="norte",
-            color="diametro",
-            color_continuous_scale="Blues",
-            custom_data=["numero","diametro"],
-            title="Mapa de variabilidad de diámetro de pozos",
-            labels={"este": "Este (X)", "norte": "Norte (Y)", "diametro": "Diámetro (mm)"}
-        )
-        fig_diam.update_traces(hovertemplate="Pozo: <b>%{customdata[0]}</b><br>Diámetro: <b>%{customdata[1]} mm</b><extra></extra>")
-        aplicar_estilo_figura(fig_diam, scatter_xy=True)
-        st.plotly_chart(fig_diam, use_container_width=True)
+        st.write(diametro["estadisticos"])
+        st.markdown(f"- **% pozos fuera de tolerancia de diámetro (±{diametro['tolerancia']} mm):** {diametro['pct_fuera']:.1f}%")
+        st.plotly_chart(diametro["fig"], use_container_width=True)
 
     # 7. Carga total y específica en zonas críticas
-    if "kilos_cargados_real" in df_procesado.columns:
+    zonas = reporte["zonas"]
+    if zonas is not None:
         st.subheader("Carga total y específica en zonas críticas (bordes del banco)")
-        # Si hay columna de polígono, banco o zona, agrupar
-        col_zona = None
-        for c in ["holes_polygon","banco","zona"]:
-            if c in df_procesado.columns:
-                col_zona = c
-                break
-        if col_zona:
-            df_zona = df_procesado[[col_zona,"kilos_cargados_real","longitud_real","este","norte"]].copy()
-            df_zona = preparar_columnas_aux(df_zona)
-            resumen = df_zona.groupby(col_zona).agg(
-                total_kg = ("kilos_cargados_real","sum"),
-                total_long = ("longitud_real","sum"),
-                n_pozos = ("kilos_cargados_real","count")
-            )
-            resumen["kg_por_m"] = resumen["total_kg"] / resumen["total_long"].replace(0,np.nan)
-            resumen = resumen.round(2)
+        if zonas["columna"]:
             st.markdown("**Resumen por zona crítica:**")
-            st.dataframe(resumen)
-            # Visualización espacial
-            fig_zona = px.scatter(
-                df_zona,
-                x="este",
-                y="norte",
-                color=col_zona,
-                size="kilos_cargados_real",
-                custom_data=[col_zona,"kilos_cargados_real"],
-                title=f"Distribución de carga de explosivo por {col_zona}",
-                labels={"este": "Este (X)", "norte": "Norte (Y)", col_zona: col_zona, "kilos_cargados_real": "Kg Explosivo"}
-            )
-            fig_zona.update_traces(hovertemplate=f"Zona: <b>%{{customdata[0]}}</b><br>Kg explosivo: <b>%{{customdata[1]}}</b><extra></extra>")
-            aplicar_estilo_figura(fig_zona, scatter_xy=True)
-            st.plotly_chart(fig_zona, use_container_width=True)
+            st.dataframe(zonas["resumen"])
+            st.plotly_chart(zonas["fig"], use_container_width=True)
         else:
             st.info("No se encontró columna de zona crítica (polígono, banco o zona) para análisis específico.")
 
-    # =============================
-    # Agregar columna mes_tronadura calculada
-    # =============================
-    if "fecha_tronadura" in df_procesado.columns:
-        try:
-            df_procesado["mes_tronadura"] = df_procesado["fecha_tronadura"].dt.month_name(locale="es_ES")
-        except:
-            df_procesado["mes_tronadura"] = df_procesado["fecha_tronadura"].dt.month
-
     # =============================
     # PESTAÑAS DE VISUALIZACIÓN
     # =============================
+    dashboard = reporte["dashboard"]
+    figuras_3d = reporte["3d"]
+    columnas_categoricas = dashboard["columnas_categoricas"]
     tab_dashboard, tab_mapa, tab_3d = st.tabs(["Dashboard", "Mapa de calor", "3D"])
 
     with tab_dashboard:
         st.subheader("Dashboard de Indicadores y Gráficos")
+        factor_carga = dashboard["factor_carga"]
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total de Pozos", len(df_procesado))
+            st.metric("Total de Pozos", dashboard["total_pozos"])
         with col2:
-            if "factor_carga" in df_procesado.columns:
-                promedio_fc = df_procesado["factor_carga"].mean()
-                st.metric("Promedio Factor de Carga", f"{promedio_fc:.2f} kg/m")
+            if factor_carga is not None:
+                st.metric("Promedio Factor de Carga", f"{factor_carga['promedio']:.2f} kg/m")
         with col3:
-            if "factor_carga" in df_procesado.columns:
-                min_fc = df_procesado["factor_carga"].min()
-                max_fc = df_procesado["factor_carga"].max()
-                st.metric("Rango Factor de Carga", f"{min_fc:.2f} - {max_fc:.2f} kg/m")
+            if factor_carga is not None:
+                st.metric("Rango Factor de Carga", f"{factor_carga['min']:.2f} - {factor_carga['max']:.2f} kg/m")
 
         # Histograma de factor de carga
-        if "factor_carga" in df_procesado.columns:
+        if dashboard["fig_hist"] is not None:
             st.markdown("**Distribución del Factor de Carga (kg/m):**")
-            fig_hist = px.histogram(df_procesado, x="factor_carga", nbins=20, title="Histograma de Factor de Carga", labels={"factor_carga": "Factor de Carga (kg/m)"})
-            aplicar_estilo_figura(fig_hist)
-            st.plotly_chart(fig_hist, use_container_width=True)
+            st.plotly_chart(dashboard["fig_hist"], use_container_width=True)
 
         # Boxplot de kilos de explosivo por cota
-        if "kilos_cargados_real" in df_procesado.columns and "cota" in df_procesado.columns:
+        if dashboard["fig_box"] is not None:
             st.markdown("**Boxplot de Kilos de Explosivo por Cota:**")
-            fig_box = px.box(df_procesado, x="cota", y="kilos_cargados_real", points="all", title="Boxplot de Kilos de Explosivo por Cota", labels={"cota": "Cota (msnm)", "kilos_cargados_real": "Kg Explosivo"})
-            aplicar_estilo_figura(fig_box)
-            st.plotly_chart(fig_box, use_container_width=True)
+            st.plotly_chart(dashboard["fig_box"], use_container_width=True)
         else:
             st.info("No se puede mostrar el boxplot: faltan las columnas 'cota' y/o 'kilos_cargados_real' en los datos.")
 
         # Gráfico de pie: selección dinámica de columna categórica
-        columnas_categoricas = [col for col in df_procesado.columns if df_procesado[col].nunique() > 1 and df_procesado[col].nunique() <= 20 and col not in ["este", "norte", "cota", "x", "y", "z", "factor_carga", "kilos_cargados_real", "longitud_real"] and not pd.api.types.is_numeric_dtype(df_procesado[col])]
         st.markdown("**Gráfico de Torta (Pie Chart):**")
         if columnas_categoricas:
             col_pie = st.selectbox("Selecciona la columna categórica para el pie chart", columnas_categoricas, key="piechart_dashboard")
-            pie_counts = df_procesado[col_pie].value_counts().reset_index()
-            pie_counts.columns = [col_pie, "Cantidad"]
-            fig_pie = px.pie(pie_counts, names=col_pie, values="Cantidad", title=f"Distribución por {col_pie}", hole=0.3)
-            aplicar_estilo_figura(fig_pie)
+            if col_pie in dashboard["figs_pie"]:
+                fig_pie = dashboard["figs_pie"][col_pie]
+            else:
+                fig_pie = figura_pie(obtener_df_pestanas(), col_pie)
             st.plotly_chart(fig_pie, use_container_width=True)
         else:
             st.info("No hay columnas categóricas adecuadas para graficar en torta (pie chart). Asegúrate de tener columnas tipo categoría con pocos valores únicos.")
@@ -438,76 +186,111 @@ if archivo is not None:
     with tab_mapa:
         st.subheader("Mapa de calor y visualización geográfica")
         # Scatterplot por variable categórica seleccionable
-        columnas_categoricas_scatter = [col for col in df_procesado.columns if df_procesado[col].nunique() > 1 and df_procesado[col].nunique() <= 20 and col not in ["este", "norte", "cota", "x", "y", "z", "factor_carga", "kilos_cargados_real", "longitud_real"] and not pd.api.types.is_numeric_dtype(df_procesado[col])]
         st.markdown("**Mapa de pozos por variable categórica:**")
-        if columnas_categoricas_scatter:
-            col_scatter = st.selectbox("Selecciona la variable para colorear el scatter", columnas_categoricas_scatter, key="scatter_categorica_mapa")
-            fig_scatter_polygon = px.scatter(
-                df_procesado,
-                x="este",
-                y="norte",
-                color=col_scatter,
-                hover_data=[col for col in ["numero", "id_pozo", "cota", "kilos_cargados_real", "factor_carga", col_scatter] if col in df_procesado.columns],
-                title=f"Pozos coloreados por {col_scatter}",
-                labels={"este": "Este (X)", "norte": "Norte (Y)", col_scatter: col_scatter},
-                color_discrete_sequence=px.colors.qualitative.Set1
-            )
-            aplicar_estilo_figura(fig_scatter_polygon, scatter_xy=True)
+        if columnas_categoricas:
+            col_scatter = st.selectbox("Selecciona la variable para colorear el scatter", columnas_categoricas, key="scatter_categorica_mapa")
+            if col_scatter in dashboard["figs_scatter"]:
+                fig_scatter_polygon = dashboard["figs_scatter"][col_scatter]
+            else:
+                fig_scatter_polygon = figura_scatter_categorica(obtener_df_pestanas(), col_scatter)
             st.plotly_chart(fig_scatter_polygon, use_container_width=True)
         else:
             st.info("No hay columnas categóricas adecuadas para colorear el scatterplot.")
 
     with tab_3d:
         st.subheader("Visualización 3D de Pozos")
-        columnas_3d = [col for col in ["este", "norte", "cota", "factor_carga", "kilos_cargados_real"] if col in df_procesado.columns]
-        if all(col in df_procesado.columns for col in ["este", "norte", "cota"]):
-            color_col = "factor_carga" if "factor_carga" in df_procesado.columns else ("kilos_cargados_real" if "kilos_cargados_real" in df_procesado.columns else None)
-            fig_3d = px.scatter_3d(
-                df_procesado,
-                x="este",
-                y="norte",
-                z="cota",
-                color=color_col,
-                color_continuous_scale="RdYlGn_r",
-                hover_data=columnas_3d,
-                title="Pozos de Tronadura en 3D (Cota)",
-                labels={"este": "Este (UTM)", "norte": "Norte (UTM)", "cota": "Cota (msnm)", "factor_carga": "Factor de carga (kg/m)", "kilos_cargados_real": "Kg explosivo"}
-            )
-            fig_3d.update_traces(marker=dict(size=5))
-            aplicar_estilo_figura(fig_3d, is_3d=True)
-            st.plotly_chart(fig_3d, use_container_width=True)
+        if figuras_3d is not None:
+            st.plotly_chart(figuras_3d["fig_tab"], use_container_width=True)
         else:
             st.info("No se puede mostrar el gráfico 3D: faltan las columnas 'este', 'norte' y/o 'cota' en los datos.")
 
     # Gráfico 3D de pozos
     st.markdown("**Visualización 3D de Pozos:**")
-    columnas_3d = [col for col in ["este", "norte", "cota", "factor_carga", "kilos_cargados_real"] if col in df_procesado.columns]
-    if all(col in df_procesado.columns for col in ["este", "norte", "cota"]):
-        color_col = "factor_carga" if "factor_carga" in df_procesado.columns else ("kilos_cargados_real" if "kilos_cargados_real" in df_procesado.columns else None)
-        df_3d = preparar_columnas_aux(df_procesado)
-        campos_hover_3d, etiquetas_3d = obtener_hover(df_3d)
-        custom_data_3d = campos_hover_3d
-        hovertemplate_3d = "<br>".join([
-            f"{etiquetas_3d[campo]}: <b>%{{customdata[{i}]}}</b>" for i, campo in enumerate(campos_hover_3d)
-        ]) + "<extra></extra>"
-        fig_3d = px.scatter_3d(
-            df_3d,
-            x="este",
-            y="norte",
-            z="cota",
-            color=color_col,
-            color_continuous_scale="RdYlGn_r",
-            custom_data=custom_data_3d,
-            hover_data=columnas_3d,
-            title="Pozos de Tronadura en 3D (Cota)",
-            labels={"este": "Este (UTM)", "norte": "Norte (UTM)", "cota": "Cota (msnm)", "factor_carga": "Factor de carga (kg/m)", "kilos_cargados_real": "Kg explosivo"}
-        )
-        fig_3d.update_traces(hovertemplate=hovertemplate_3d, marker=dict(size=5))
-        aplicar_estilo_figura(fig_3d, is_3d=True)
-        st.plotly_chart(fig_3d, use_container_width=True)
+    if figuras_3d is not None:
+        st.plotly_chart(figuras_3d["fig"], use_container_width=True)
     else:
         st.info("No se puede mostrar el gráfico 3D: faltan las columnas 'este', 'norte' y/o 'cota' en los datos.")
 
+@st.cache_resource(max_entries=16, show_spinner=False)
+def cargar_reporte_snapshot(version: str, hash_archivo: str, hash_seleccion: str) -> Dict[str, Any]:
+    """
+    Lee un snapshot una sola vez por proceso; las siguientes ejecuciones y sesiones lo reciben de memoria.
+    Las figuras se construyen aquí como go.Figure: st.plotly_chart vuelve a validar los dicts en cada
+    ejecución, mientras que una figura ya construida se envía sin validar.
+    Raises:
+        FileNotFoundError: Si no hay snapshot (las excepciones no se cachean, así que un snapshot
+            guardado más tarde sí se encuentra).
+    """
+    reporte = cargar_reporte(hash_archivo, hash_seleccion, construir_figura=go.Figure)
+    if reporte is None:
+        raise FileNotFoundError(f"No hay snapshot para {hash_archivo}/{hash_seleccion} (versión {version})")
+    return reporte
+
+# =============================
+# Sidebar para carga de datos
+# =============================
+with st.sidebar:
+    st.header("Cargar datos")
+    archivo: Optional[object] = st.file_uploader("Subir archivo Excel", type=["xlsx"])
+    usar_snapshot: bool = st.checkbox(
+        "Usar snapshot pre-renderizado",
+        value=True,
+        help="Con los filtros por defecto, el reporte se calcula una sola vez por archivo y versión de la app y se reutiliza en sesiones siguientes."
+    )
+
+if archivo is not None:
+    contenido = archivo.getvalue()
+    hash_archivo = hash_contenido(contenido)
+    datos: Dict[str, pd.DataFrame] = {}
+
+    def obtener_df() -> pd.DataFrame:
+        """Carga y procesa el Excel una sola vez por ejecución, solo cuando el snapshot no alcanza."""
+        if "procesado" not in datos:
+            datos["procesado"] = procesar_datos(cargar_datos(BytesIO(contenido)))
+        return datos["procesado"]
+
+    filtros = cargar_filtros(hash_archivo) if usar_snapshot else None
+    if filtros is None:
+        try:
+            # Cargar y procesar datos
+            df_procesado = obtener_df()
+        except Exception as e:
+            st.error(f"Error al cargar o procesar el archivo: {e}")
+            st.stop()
+
+        # Validar existencia de columnas UTM
+        columnas_utm = ["este", "norte"]
+        for col in columnas_utm:
+            if col not in df_procesado.columns:
+                st.error(f"La columna '{col}' no está presente en los datos procesados.")
+                st.stop()
+        filtros = construir_filtros(df_procesado)
+
+    # =============================
+    # Filtros dinámicos y de fecha
+    # =============================
+    seleccion = renderizar_filtros(filtros, obtener_df)
+
+    reporte = None
+    if usar_snapshot:
+        hash_seleccion = hash_filtros(seleccion)
+        try:
+            reporte = cargar_reporte_snapshot(version_app(), hash_archivo, hash_seleccion)
+            st.sidebar.caption("Reporte servido desde snapshot pre-renderizado.")
+        except FileNotFoundError:
+            pass
+    if reporte is None:
+        reporte = construir_reporte(aplicar_filtros(obtener_df(), seleccion))
+        # Solo se guarda el dashboard por defecto, que es el que abren la mayoría de las sesiones
+        if usar_snapshot and seleccion == filtros["seleccion_defecto"]:
+            try:
+                guardar_snapshot(hash_archivo, filtros, hash_seleccion, reporte)
+            except Exception as e:
+                # El snapshot es solo una optimización: si falla, el reporte se muestra igual
+                st.sidebar.warning(f"No se pudo guardar el snapshot: {e}")
+
+    renderizar_reporte(reporte, lambda: preparar_datos_pestanas(aplicar_filtros(obtener_df(), seleccion)))
+
 else:
     st.warning("Por favor sube un archivo Excel válido para comenzar.")
     st.stop()
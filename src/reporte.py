@@ -0,0 +1,502 @@
+import pandas as pd
+import numpy as np
+import plotly.express as px
+from datetime import date, timedelta
+from fractions import Fraction
+from typing import Any, Dict, List, Optional, Tuple
+
+# =============================
+# Columnas excluidas de filtros y gráficos categóricos
+# =============================
+# Excluir solo columnas técnicas (coordenadas y fecha)
+COLUMNAS_EXCLUIR_FILTROS: List[str] = [
+    "x", "y", "z", "holes_dateupdated", "camion", "longitud_teo", "uniqid", "fecha_tronadura",
+    "numero", "id_pozo", "este", "norte", "kilos_cargados_real", "nombre", "inclinacion_real", "azimuth_real", "diametro", "stemming_real", "water_level", "number_primes"
+]
+COLUMNAS_EXCLUIR_CATEGORICAS: List[str] = ["este", "norte", "cota", "x", "y", "z", "factor_carga", "kilos_cargados_real", "longitud_real"]
+
+# =============================
+# Funciones auxiliares de hover, redondeo y estilo
+# =============================
+def pulgadas_a_mixto(valor: Any) -> str:
+    """Convierte un valor en pulgadas a número mixto (ej. 6 3/4) con denominador máximo 16."""
+    if pd.isna(valor):
+        return ""
+    try:
+        valor_float = float(valor)
+    except (TypeError, ValueError):
+        return ""
+    entero = int(valor_float)
+    fraccion = round(valor_float - entero, 6)
+    if fraccion < 0:
+        fraccion = 0
+    fraccion_str = ""
+    if fraccion > 0:
+        frac = Fraction(fraccion).limit_denominator(16)
+        if frac.numerator != 0:
+            fraccion_str = f" {frac.numerator}/{frac.denominator}"
+    return f"{entero}{fraccion_str}" if fraccion_str or fraccion == 0 else f"{valor_float:.2f}"
+
+def agregar_diametro_pulgadas(df: pd.DataFrame) -> pd.DataFrame:
+    """Agrega el diámetro en pulgadas (numérico y como texto mixto) si existe la columna 'diametro'."""
+    if "diametro" not in df.columns:
+        return df
+    df = df.copy()
+    df["diametro"] = pd.to_numeric(df["diametro"], errors="coerce")
+    df["diametro_pulgadas"] = df["diametro"] / 25.4
+    df["diametro_pulgadas_str"] = df["diametro_pulgadas"].apply(pulgadas_a_mixto)
+    return df
+
+def preparar_columnas_aux(df: pd.DataFrame) -> pd.DataFrame:
+    """Prepara columnas auxiliares para hover: diámetro en pulgadas, redondeo a 2 decimales y fecha como texto."""
+    df = df.copy()
+    df = agregar_diametro_pulgadas(df)
+    # Redondear todos los campos numéricos a 2 decimales
+    for col in df.select_dtypes(include=[float, int]).columns:
+        df[col] = df[col].round(2)
+    if "fecha_tronadura" in df.columns and "fecha_tronadura_str" not in df.columns:
+        df["fecha_tronadura_str"] = df["fecha_tronadura"].dt.strftime("%d-%m-%Y")
+    return df
+
+def aplicar_estilo_figura(fig, scatter_xy: bool = False, is_3d: bool = False) -> None:
+    """Aplica fondo transparente y oculta grillas; fija proporción 1:1 en planos XY."""
+    fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
+    if scatter_xy:
+        fig.update_xaxes(showgrid=False, zeroline=False)
+        fig.update_yaxes(showgrid=False, zeroline=False, scaleanchor="x", scaleratio=1)
+    if is_3d:
+        fig.update_layout(
+            scene=dict(
+                xaxis=dict(showbackground=False, showgrid=False, zeroline=False),
+                yaxis=dict(showbackground=False, showgrid=False, zeroline=False),
+                zaxis=dict(showbackground=False, showgrid=False, zeroline=False),
+            )
+        )
+
+def obtener_hover(df: pd.DataFrame) -> Tuple[List[str], Dict[str, str]]:
+    """Genera los campos y etiquetas cortas de hover disponibles en el DataFrame."""
+    campos = []
+    etiquetas = {}
+    if "numero" in df.columns:
+        campos.append("numero"); etiquetas["numero"] = "Pozo"
+    if "nombre_banco" in df.columns:
+        campos.append("nombre_banco"); etiquetas["nombre_banco"] = "Banco"
+    if "kilos_cargados_real" in df.columns:
+        campos.append("kilos_cargados_real"); etiquetas["kilos_cargados_real"] = "Kg"
+    if "longitud_real" in df.columns:
+        campos.append("longitud_real"); etiquetas["longitud_real"] = "L(m)"
+    if "factor_carga" in df.columns:
+        campos.append("factor_carga"); etiquetas["factor_carga"] = "FC"
+    if "fecha_tronadura" in df.columns and "fecha_tronadura_str" in df.columns:
+        campos.append("fecha_tronadura_str"); etiquetas["fecha_tronadura_str"] = "Fecha"
+    if "holes_polygon" in df.columns:
+        campos.append("holes_polygon"); etiquetas["holes_polygon"] = "Malla"
+    if "diametro_pulgadas_str" in df.columns:
+        campos.append("diametro_pulgadas_str"); etiquetas["diametro_pulgadas_str"] = "Ø (pulg)"
+    return campos, etiquetas
+
+def construir_hovertemplate(campos: List[str], etiquetas: Dict[str, str]) -> str:
+    """Arma el hovertemplate con etiquetas cortas y valores en negrita a partir de customdata."""
+    return "<br>".join([
+        f"{etiquetas[campo]}: <b>%{{customdata[{i}]}}</b>" for i, campo in enumerate(campos)
+    ]) + "<extra></extra>"
+
+# =============================
+# Filtros
+# =============================
+def obtener_columnas_filtrables(df: pd.DataFrame) -> List[str]:
+    """Columnas con más de un valor que no son técnicas (coordenadas, fecha, etc.)."""
+    return [col for col in df.columns if df[col].nunique() > 1 and col.lower() not in COLUMNAS_EXCLUIR_FILTROS]
+
+def obtener_opciones_filtro(df: pd.DataFrame, col: str) -> List[Any]:
+    """Valores únicos ordenados de una columna, como tipos nativos de Python."""
+    valores = sorted(df[col].dropna().unique())
+    return [valor.item() if isinstance(valor, np.generic) else valor for valor in valores]
+
+def obtener_rango_fecha(df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """
+    Calcula los límites del filtro de fecha y el rango por defecto (últimos 30 días disponibles).
+    Returns:
+        Diccionario con 'min', 'max' y 'defecto' (lista de una o dos fechas), o None si no hay fechas válidas.
+    """
+    if "fecha_tronadura" not in df.columns:
+        return None
+    fechas_validas = df["fecha_tronadura"].dropna().dt.date
+    if fechas_validas.empty:
+        return None
+    min_fecha = fechas_validas.min()
+    max_fecha = fechas_validas.max()
+    if min_fecha != max_fecha:
+        defecto = [max(min_fecha, max_fecha - timedelta(days=30)), max_fecha]
+    else:
+        defecto = [min_fecha]
+    return {"min": min_fecha, "max": max_fecha, "defecto": defecto}
+
+def normalizar_rango_fecha(rango_fecha: Any) -> List[date]:
+    """Convierte el valor del selector de fecha (fecha única o tupla) en una lista de fechas."""
+    if isinstance(rango_fecha, (tuple, list)):
+        return list(rango_fecha)
+    return [rango_fecha] if rango_fecha else []
+
+def aplicar_filtros(df: pd.DataFrame, seleccion: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Aplica la selección de filtros al DataFrame procesado.
+    Args:
+        df: DataFrame procesado.
+        seleccion: 'fecha_tronadura' con una o dos fechas y, por columna, la lista de valores seleccionados.
+    Returns:
+        DataFrame filtrado.
+    """
+    for col, valores in seleccion.items():
+        if col == "fecha_tronadura":
+            if len(valores) == 2:
+                df = df[(df["fecha_tronadura"].dt.date >= valores[0]) & (df["fecha_tronadura"].dt.date <= valores[1])]
+            elif len(valores) == 1:
+                df = df[df["fecha_tronadura"].dt.date == valores[0]]
+        elif valores:
+            df = df[df[col].isin(valores)]
+    return df
+
+def construir_filtros(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Describe los filtros del sidebar en su estado por defecto para poder dibujarlos sin recargar el Excel.
+    Returns:
+        Diccionario con 'fecha' (ver obtener_rango_fecha), 'columnas' filtrables,
+        'opciones' por columna y 'seleccion_defecto'.
+    """
+    fecha = obtener_rango_fecha(df)
+    seleccion_defecto = {"fecha_tronadura": fecha["defecto"]} if fecha else {}
+    columnas = obtener_columnas_filtrables(df)
+    df_defecto = aplicar_filtros(df, seleccion_defecto)
+    return {
+        "fecha": fecha,
+        "columnas": columnas,
+        "opciones": {col: obtener_opciones_filtro(df_defecto, col) for col in columnas},
+        "seleccion_defecto": seleccion_defecto,
+    }
+
+# =============================
+# Columnas calculadas
+# =============================
+def calcular_factor_carga(df: pd.DataFrame) -> pd.DataFrame:
+    """Calcula el factor de carga (kg/m) como kilos_cargados_real / longitud_real."""
+    df = df.copy()
+    if "kilos_cargados_real" in df.columns and "longitud_real" in df.columns:
+        df["factor_carga"] = df["kilos_cargados_real"] / df["longitud_real"]
+        df["factor_carga"] = df["factor_carga"].replace([np.inf, -np.inf], np.nan)
+    elif "factor_carga" in df.columns:
+        df["factor_carga"] = pd.to_numeric(df["factor_carga"], errors="coerce")
+    return df
+
+def agregar_mes_tronadura(df: pd.DataFrame) -> pd.DataFrame:
+    """Agrega la columna mes_tronadura (nombre del mes en español o número si no hay locale)."""
+    if "fecha_tronadura" not in df.columns:
+        return df
+    df = df.copy()
+    try:
+        df["mes_tronadura"] = df["fecha_tronadura"].dt.month_name(locale="es_ES")
+    except Exception:
+        df["mes_tronadura"] = df["fecha_tronadura"].dt.month
+    return df
+
+def preparar_datos_pestanas(df: pd.DataFrame) -> pd.DataFrame:
+    """Deja el DataFrame filtrado con las columnas calculadas que usan las pestañas."""
+    return agregar_mes_tronadura(calcular_factor_carga(df))
+
+def obtener_columnas_categoricas(df: pd.DataFrame) -> List[str]:
+    """Columnas no numéricas con entre 2 y 20 valores únicos, aptas para torta y scatter categórico."""
+    return [col for col in df.columns if df[col].nunique() > 1 and df[col].nunique() <= 20 and col not in COLUMNAS_EXCLUIR_CATEGORICAS and not pd.api.types.is_numeric_dtype(df[col])]
+
+def _estadisticos(serie: pd.Series) -> pd.Series:
+    """Media, desviación estándar, mínimo y máximo de una serie con etiquetas en español."""
+    return serie.describe()[["mean","std","min","max"]].rename({"mean":"Media","std":"Desv.Est.","min":"Mínimo","max":"Máximo"})
+
+# =============================
+# Figuras
+# =============================
+def figura_utm(df_vista: pd.DataFrame):
+    """Mapa de calor de pozos en plano UTM coloreado por kilos de explosivo."""
+    df_vista = preparar_columnas_aux(df_vista)
+    campos_hover, etiquetas = obtener_hover(df_vista)
+    color_col = None
+    color_scale = None
+    if "kilos_cargados_real" in df_vista.columns:
+        color_col = "kilos_cargados_real"
+        color_scale = "RdYlGn_r"  # Escala verde (bajo) a rojo (alto)
+    fig = px.scatter(
+        df_vista,
+        x="este",
+        y="norte",
+        color=color_col,
+        color_continuous_scale=color_scale if color_scale else None,
+        custom_data=campos_hover,
+        title="Mapa de calor de pozos según kilos de explosivo",
+        labels={"este": "Este (X)", "norte": "Norte (Y)", "kilos_cargados_real": "Kg Explosivo"}
+    )
+    fig.update_traces(hovertemplate=construir_hovertemplate(campos_hover, etiquetas))
+    aplicar_estilo_figura(fig, scatter_xy=True)
+    return fig
+
+def figura_pie(df: pd.DataFrame, col_pie: str):
+    """Gráfico de torta con la cantidad de pozos por valor de una columna categórica."""
+    pie_counts = df[col_pie].value_counts().reset_index()
+    pie_counts.columns = [col_pie, "Cantidad"]
+    fig_pie = px.pie(pie_counts, names=col_pie, values="Cantidad", title=f"Distribución por {col_pie}", hole=0.3)
+    aplicar_estilo_figura(fig_pie)
+    return fig_pie
+
+def figura_scatter_categorica(df: pd.DataFrame, col_scatter: str):
+    """Pozos en plano UTM coloreados por una variable categórica."""
+    fig_scatter_polygon = px.scatter(
+        df,
+        x="este",
+        y="norte",
+        color=col_scatter,
+        hover_data=[col for col in ["numero", "id_pozo", "cota", "kilos_cargados_real", "factor_carga", col_scatter] if col in df.columns],
+        title=f"Pozos coloreados por {col_scatter}",
+        labels={"este": "Este (X)", "norte": "Norte (Y)", col_scatter: col_scatter},
+        color_discrete_sequence=px.colors.qualitative.Set1
+    )
+    aplicar_estilo_figura(fig_scatter_polygon, scatter_xy=True)
+    return fig_scatter_polygon
+
+# =============================
+# Secciones del reporte
+# =============================
+def analizar_factor_carga(df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """Uniformidad del factor de carga: estadísticos y mapas de calor espaciales."""
+    if "factor_carga" not in df.columns:
+        return None
+    df_factor = df.copy()
+    df_factor["factor_carga"] = pd.to_numeric(df_factor["factor_carga"], errors="coerce")
+    df_factor = df_factor[df_factor["factor_carga"].notnull() & df_factor["factor_carga"].apply(lambda x: x != float('inf') and x != float('-inf'))]
+    if df_factor.empty:
+        return {"vacio": True}
+    estadisticos = _estadisticos(df_factor["factor_carga"])
+    df_factor = preparar_columnas_aux(df_factor)
+    campos_hover_factor, etiquetas_factor = obtener_hover(df_factor)
+    hovertemplate_factor = construir_hovertemplate(campos_hover_factor, etiquetas_factor)
+    fig_tamano = px.scatter(
+        df_factor,
+        x="este",
+        y="norte",
+        color="factor_carga",
+        size="factor_carga",
+        size_max=15,
+        color_continuous_scale="RdYlGn_r",
+        custom_data=campos_hover_factor,
+        title="Mapa de calor espacial del factor de carga (kg/m)",
+        labels={"este": "Este (X)", "norte": "Norte (Y)", "factor_carga": "Factor de carga (kg/m)"}
+    )
+    fig_tamano.update_traces(hovertemplate=hovertemplate_factor)
+    aplicar_estilo_figura(fig_tamano, scatter_xy=True)
+    fig_calor = px.scatter(
+        df_factor,
+        x="este",
+        y="norte",
+        color="factor_carga",
+        color_continuous_scale="RdYlGn_r",
+        custom_data=campos_hover_factor,
+        title="Mapa de calor de pozos según factor de carga (kg/m)",
+        labels={"este": "Este (X)", "norte": "Norte (Y)", "factor_carga": "Factor de carga (kg/m)"}
+    )
+    fig_calor.update_traces(hovertemplate=hovertemplate_factor)
+    aplicar_estilo_figura(fig_calor, scatter_xy=True)
+    return {
+        "vacio": False,
+        "estadisticos": estadisticos,
+        "fig_tamano": fig_tamano,
+        "fig_calor": fig_calor,
+        "uniforme": bool(df_factor["factor_carga"].nunique() <= 1),
+    }
+
+def analizar_longitud(df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """Control de longitud real vs teórica: estadísticos, % sub/sobre-perforados y mapa."""
+    if "longitud_real" not in df.columns or "longitud_teo" not in df.columns:
+        return None
+    df_long = df[["numero","longitud_real","longitud_teo","este","norte"]].copy()
+    df_long = df_long[df_long["longitud_real"].notnull() & df_long["longitud_teo"].notnull()]
+    df_long = preparar_columnas_aux(df_long)
+    # Cálculo de desviación relativa (%)
+    df_long["desviacion_%"] = 100 * (df_long["longitud_real"] - df_long["longitud_teo"]) / df_long["longitud_teo"]
+    # Clasificación de pozos
+    df_long["clasificacion"] = "Dentro de tolerancia"
+    df_long.loc[df_long["desviacion_%"] < -5, "clasificacion"] = "Sub-perforado (<-5%)"
+    df_long.loc[df_long["desviacion_%"] > 5, "clasificacion"] = "Sobre-perforado (>+5%)"
+    total_pozos = len(df_long)
+    n_sub = (df_long["clasificacion"] == "Sub-perforado (<-5%)").sum()
+    n_sobre = (df_long["clasificacion"] == "Sobre-perforado (>+5%)").sum()
+    fig_long = px.scatter(
+        df_long,
+        x="este",
+        y="norte",
+        color="clasificacion",
+        custom_data=["numero","longitud_real","longitud_teo","desviacion_%","clasificacion"],
+        title="Distribución espacial de pozos según desviación de longitud",
+        labels={"este": "Este (X)", "norte": "Norte (Y)", "clasificacion": "Clasificación"}
+    )
+    fig_long.update_traces(hovertemplate="Pozo: <b>%{customdata[0]}</b><br>Long. real: <b>%{customdata[1]} m</b><br>Long. teórica: <b>%{customdata[2]} m</b><br>Desviación: <b>%{customdata[3]:.2f}%</b><br>Estado: <b>%{customdata[4]}</b><extra></extra>")
+    aplicar_estilo_figura(fig_long, scatter_xy=True)
+    return {
+        "estadisticos": _estadisticos(df_long["longitud_real"]),
+        "desviacion_std": float(df_long["longitud_real"].std()),
+        "pct_sub": float(100 * n_sub / total_pozos) if total_pozos else float("nan"),
+        "pct_sobre": float(100 * n_sobre / total_pozos) if total_pozos else float("nan"),
+        "fig": fig_long,
+    }
+
+def analizar_diametro(df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """Variabilidad de diámetro de pozos: estadísticos, % fuera de tolerancia y mapa."""
+    if "diametro" not in df.columns:
+        return None
+    df_var = df[["numero","este","norte","diametro"]].copy()
+    df_var = preparar_columnas_aux(df_var)
+    # Definir tolerancia (ejemplo: diámetro ±3mm)
+    tolerancia_diam = 3
+    nominal = df_var["diametro"].mode()[0] if not df_var["diametro"].mode().empty else df_var["diametro"].mean()
+    df_var["diametro_fuera_tol"] = abs(df_var["diametro"] - nominal) > tolerancia_diam
+    pct_fuera = 100 * df_var["diametro_fuera_tol"].sum() / len(df_var) if len(df_var) else float("nan")
+    fig_diam = px.scatter(
+        df_var,
+        x="este",
+        y="norte",
+        color="diametro",
+        color_continuous_scale="Blues",
+        custom_data=["numero","diametro"],
+        title="Mapa de variabilidad de diámetro de pozos",
+        labels={"este": "Este (X)", "norte": "Norte (Y)", "diametro": "Diámetro (mm)"}
+    )
+    fig_diam.update_traces(hovertemplate="Pozo: <b>%{customdata[0]}</b><br>Diámetro: <b>%{customdata[1]} mm</b><extra></extra>")
+    aplicar_estilo_figura(fig_diam, scatter_xy=True)
+    return {
+        "estadisticos": _estadisticos(df_var["diametro"]),
+        "tolerancia": tolerancia_diam,
+        "pct_fuera": float(pct_fuera),
+        "fig": fig_diam,
+    }
+
+def analizar_zonas(df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """Carga total y específica por zona crítica (polígono, banco o zona)."""
+    if "kilos_cargados_real" not in df.columns:
+        return None
+    # Si hay columna de polígono, banco o zona, agrupar
+    col_zona = None
+    for c in ["holes_polygon","banco","zona"]:
+        if c in df.columns:
+            col_zona = c
+            break
+    if not col_zona:
+        return {"columna": None}
+    df_zona = df[[col_zona,"kilos_cargados_real","longitud_real","este","norte"]].copy()
+    df_zona = preparar_columnas_aux(df_zona)
+    resumen = df_zona.groupby(col_zona).agg(
+        total_kg = ("kilos_cargados_real","sum"),
+        total_long = ("longitud_real","sum"),
+        n_pozos = ("kilos_cargados_real","count")
+    )
+    resumen["kg_por_m"] = resumen["total_kg"] / resumen["total_long"].replace(0,np.nan)
+    resumen = resumen.round(2)
+    fig_zona = px.scatter(
+        df_zona,
+        x="este",
+        y="norte",
+        color=col_zona,
+        size="kilos_cargados_real",
+        custom_data=[col_zona,"kilos_cargados_real"],
+        title=f"Distribución de carga de explosivo por {col_zona}",
+        labels={"este": "Este (X)", "norte": "Norte (Y)", col_zona: col_zona, "kilos_cargados_real": "Kg Explosivo"}
+    )
+    fig_zona.update_traces(hovertemplate=f"Zona: <b>%{{customdata[0]}}</b><br>Kg explosivo: <b>%{{customdata[1]}}</b><extra></extra>")
+    aplicar_estilo_figura(fig_zona, scatter_xy=True)
+    return {"columna": col_zona, "resumen": resumen, "fig": fig_zona}
+
+def construir_dashboard(df: pd.DataFrame) -> Dict[str, Any]:
+    """Métricas, histograma, boxplot y gráficos categóricos por defecto de las pestañas."""
+    dashboard: Dict[str, Any] = {"total_pozos": len(df), "factor_carga": None, "fig_hist": None, "fig_box": None}
+    if "factor_carga" in df.columns:
+        dashboard["factor_carga"] = {
+            "promedio": float(df["factor_carga"].mean()),
+            "min": float(df["factor_carga"].min()),
+            "max": float(df["factor_carga"].max()),
+        }
+        fig_hist = px.histogram(df, x="factor_carga", nbins=20, title="Histograma de Factor de Carga", labels={"factor_carga": "Factor de Carga (kg/m)"})
+        aplicar_estilo_figura(fig_hist)
+        dashboard["fig_hist"] = fig_hist
+    if "kilos_cargados_real" in df.columns and "cota" in df.columns:
+        fig_box = px.box(df, x="cota", y="kilos_cargados_real", points="all", title="Boxplot de Kilos de Explosivo por Cota", labels={"cota": "Cota (msnm)", "kilos_cargados_real": "Kg Explosivo"})
+        aplicar_estilo_figura(fig_box)
+        dashboard["fig_box"] = fig_box
+    # Solo se pre-renderiza la primera opción, que es la que muestran los selectores por defecto
+    columnas_categoricas = obtener_columnas_categoricas(df)
+    dashboard["columnas_categoricas"] = columnas_categoricas
+    dashboard["figs_pie"] = {col: figura_pie(df, col) for col in columnas_categoricas[:1]}
+    dashboard["figs_scatter"] = {col: figura_scatter_categorica(df, col) for col in columnas_categoricas[:1]}
+    return dashboard
+
+def figuras_3d(df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """Gráficos 3D de pozos (pestaña 3D y vista con hover personalizado)."""
+    if not all(col in df.columns for col in ["este", "norte", "cota"]):
+        return None
+    columnas_3d = [col for col in ["este", "norte", "cota", "factor_carga", "kilos_cargados_real"] if col in df.columns]
+    color_col = "factor_carga" if "factor_carga" in df.columns else ("kilos_cargados_real" if "kilos_cargados_real" in df.columns else None)
+    etiquetas_3d_ejes = {"este": "Este (UTM)", "norte": "Norte (UTM)", "cota": "Cota (msnm)", "factor_carga": "Factor de carga (kg/m)", "kilos_cargados_real": "Kg explosivo"}
+    fig_tab = px.scatter_3d(
+        df,
+        x="este",
+        y="norte",
+        z="cota",
+        color=color_col,
+        color_continuous_scale="RdYlGn_r",
+        hover_data=columnas_3d,
+        title="Pozos de Tronadura en 3D (Cota)",
+        labels=etiquetas_3d_ejes
+    )
+    fig_tab.update_traces(marker=dict(size=5))
+    aplicar_estilo_figura(fig_tab, is_3d=True)
+    df_3d = preparar_columnas_aux(df)
+    campos_hover_3d, etiquetas_3d = obtener_hover(df_3d)
+    fig_3d = px.scatter_3d(
+        df_3d,
+        x="este",
+        y="norte",
+        z="cota",
+        color=color_col,
+        color_continuous_scale="RdYlGn_r",
+        custom_data=campos_hover_3d,
+        hover_data=columnas_3d,
+        title="Pozos de Tronadura en 3D (Cota)",
+        labels=etiquetas_3d_ejes
+    )
+    fig_3d.update_traces(hovertemplate=construir_hovertemplate(campos_hover_3d, etiquetas_3d), marker=dict(size=5))
+    aplicar_estilo_figura(fig_3d, is_3d=True)
+    return {"fig_tab": fig_tab, "fig": fig_3d}
+
+# =============================
+def construir_reporte(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Calcula todo el contenido del reporte (tablas, métricas y figuras) sin dibujar nada en pantalla.
+    Args:
+        df: DataFrame procesado y filtrado.
+    Returns:
+        Diccionario con una entrada por sección; None si la sección no aplica a los datos.
+    """
+    df = calcular_factor_carga(df)
+    # Redondear todos los campos numéricos a 2 decimales para visualización y hover
+    df_vista = df.copy()
+    for col in df_vista.select_dtypes(include=[float, int]).columns:
+        df_vista[col] = df_vista[col].round(2)
+    reporte: Dict[str, Any] = {
+        "vista_previa": df_vista.head(),
+        "fig_utm": figura_utm(df_vista),
+        "factor_carga": analizar_factor_carga(df),
+        "longitud": analizar_longitud(df),
+        "diametro": analizar_diametro(df),
+        "zonas": analizar_zonas(df),
+    }
+    df = agregar_mes_tronadura(df)
+    reporte["dashboard"] = construir_dashboard(df)
+    reporte["3d"] = figuras_3d(df)
+    return reporte
+
+# =============================
+# NOTA: Mantener este módulo libre de llamadas a Streamlit; la UI vive en main.py.
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time as reloj
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from io import StringIO
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+import plotly
+from plotly.basedatatypes import BaseFigure
+
+# =============================
+# Snapshots pre-renderizados del reporte por defecto
+# =============================
+# Estructura en disco: DIRECTORIO_SNAPSHOTS/<version_app>/<hash_archivo>/
+#   - filtros.json: definición de los filtros del sidebar en su estado por defecto.
+#     Su fecha de modificación marca el último uso del snapshot.
+#   - <hash_filtros>.json: reporte completo (métricas, tablas y JSON de figuras).
+# Un archivo distinto tiene otro hash de contenido y un cambio de código o de
+# dependencias cambia la versión, por lo que los snapshots viejos nunca se reutilizan.
+APP_VERSION: str = "1.0.0"
+DIRECTORIO_SNAPSHOTS: Path = Path(__file__).resolve().parent.parent / ".snapshots"
+ARCHIVO_FILTROS: str = "filtros.json"
+# Límites por versión: se eliminan los archivos sin uso en DIAS_RETENCION días
+# y, de los restantes, se conservan solo los MAX_ARCHIVOS usados más recientemente.
+DIAS_RETENCION: int = 7
+MAX_ARCHIVOS: int = 30
+
+@lru_cache(maxsize=1)
+def version_app() -> str:
+    """
+    Identificador de la versión de la app usado para invalidar snapshots.
+    Combina APP_VERSION, las versiones de pandas y plotly y el contenido de los módulos en src/.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{APP_VERSION}|{pd.__version__}|{plotly.__version__}".encode())
+    for ruta in sorted(Path(__file__).resolve().parent.glob("*.py")):
+        digest.update(ruta.name.encode())
+        digest.update(ruta.read_bytes())
+    return digest.hexdigest()[:16]
+
+def hash_contenido(contenido: bytes) -> str:
+    """Hash SHA-256 del contenido del archivo Excel subido."""
+    return hashlib.sha256(contenido).hexdigest()
+
+def hash_filtros(seleccion: Dict[str, Any]) -> str:
+    """
+    Hash SHA-256 estable de la selección de filtros (independiente del orden de las claves).
+    Los valores que el snapshot no sabe codificar se representan con str() para no fallar nunca.
+    """
+    def _codificar_o_texto(obj: Any) -> Any:
+        try:
+            return _codificar(obj)
+        except TypeError:
+            return {"__texto__": str(obj)}
+    texto = json.dumps(seleccion, default=_codificar_o_texto, sort_keys=True)
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+# =============================
+# Serialización
+# =============================
+def _codificar(obj: Any) -> Any:
+    """Convierte a JSON los tipos que json no soporta: figuras, tablas, fechas, horas, duraciones y escalares numpy."""
+    if isinstance(obj, BaseFigure):
+        return {"__figura__": json.loads(obj.to_json())}
+    if isinstance(obj, pd.DataFrame):
+        return {"__tabla__": _tabla_a_json(obj)}
+    if isinstance(obj, pd.Series):
+        return {"__serie__": _tabla_a_json(obj.to_frame())}
+    if isinstance(obj, datetime):
+        return {"__timestamp__": pd.Timestamp(obj).isoformat()}
+    if isinstance(obj, date):
+        return {"__fecha__": obj.isoformat()}
+    if isinstance(obj, time):
+        return {"__hora__": obj.isoformat()}
+    if isinstance(obj, timedelta):
+        return {"__duracion__": pd.Timedelta(obj).isoformat()}
+    if isinstance(obj, Decimal):
+        return {"__decimal__": str(obj)}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Tipo no serializable en snapshot: {type(obj).__name__}")
+
+def _tabla_a_json(df: pd.DataFrame) -> str:
+    # pandas no puede leer duraciones ISO con orient="table"; se guardan como texto
+    columnas_duracion = df.select_dtypes(include=["timedelta"]).columns
+    if len(columnas_duracion):
+        df = df.astype({col: str for col in columnas_duracion})
+    return df.to_json(orient="table", date_format="iso")
+
+def _decodificador(construir_figura: Callable[[Dict[str, Any]], Any]) -> Callable[[Dict[str, Any]], Any]:
+    """Crea el object_hook de json.loads que invierte _codificar."""
+    def _decodificar(obj: Dict[str, Any]) -> Any:
+        if "__figura__" in obj:
+            return construir_figura(obj["__figura__"])
+        if "__tabla__" in obj:
+            return pd.read_json(StringIO(obj["__tabla__"]), orient="table")
+        if "__serie__" in obj:
+            return pd.read_json(StringIO(obj["__serie__"]), orient="table").iloc[:, 0]
+        if "__timestamp__" in obj:
+            return pd.Timestamp(obj["__timestamp__"])
+        if "__fecha__" in obj:
+            return date.fromisoformat(obj["__fecha__"])
+        if "__hora__" in obj:
+            return time.fromisoformat(obj["__hora__"])
+        if "__duracion__" in obj:
+            return pd.Timedelta(obj["__duracion__"])
+        if "__decimal__" in obj:
+            return Decimal(obj["__decimal__"])
+        return obj
+    return _decodificar
+
+def _a_json(obj: Any) -> str:
+    return json.dumps(obj, default=_codificar)
+
+def _leer(ruta: Path, construir_figura: Callable[[Dict[str, Any]], Any]) -> Optional[Any]:
+    """Lee un snapshot; devuelve None si no existe o no se puede decodificar."""
+    try:
+        texto = ruta.read_text(encoding="utf-8")
+    except OSError:
+        return None
+    try:
+        return json.loads(texto, object_hook=_decodificador(construir_figura))
+    except Exception:
+        # Un snapshot ilegible se trata como inexistente: se recalcula y se sobrescribe
+        return None
+
+def _escribir(ruta: Path, texto: str) -> None:
+    """Escribe de forma atómica para que otra sesión nunca lea un snapshot a medio escribir."""
+    fd, tmp = tempfile.mkstemp(dir=ruta.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(texto)
+        os.replace(tmp, ruta)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+# =============================
+# Lectura y escritura de snapshots
+# =============================
+def _directorio_version() -> Path:
+    return DIRECTORIO_SNAPSHOTS / version_app()
+
+def _directorio_archivo(hash_archivo: str) -> Path:
+    return _directorio_version() / hash_archivo
+
+def cargar_filtros(hash_archivo: str) -> Optional[Dict[str, Any]]:
+    """Definición de filtros guardada para el archivo, o None si no hay snapshot vigente."""
+    ruta = _directorio_archivo(hash_archivo) / ARCHIVO_FILTROS
+    filtros = _leer(ruta, lambda figura: figura)
+    if filtros is not None:
+        # Registrar el uso para que la limpieza por antigüedad no lo elimine
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+    return filtros
+
+def cargar_reporte(
+    hash_archivo: str,
+    hash_seleccion: str,
+    construir_figura: Callable[[Dict[str, Any]], Any] = lambda figura: figura,
+) -> Optional[Dict[str, Any]]:
+    """
+    Reporte pre-renderizado para el archivo y la selección de filtros, o None si no existe.
+    Args:
+        hash_archivo: Hash del contenido del archivo.
+        hash_seleccion: Hash de la selección de filtros.
+        construir_figura: Se aplica a cada figura; por defecto se devuelve el dict de Plotly tal cual.
+    """
+    return _leer(_directorio_archivo(hash_archivo) / f"{hash_seleccion}.json", construir_figura)
+
+def guardar_snapshot(hash_archivo: str, filtros: Dict[str, Any], hash_seleccion: str, reporte: Dict[str, Any]) -> None:
+    """
+    Guarda la definición de filtros y el reporte, y aplica los límites de retención.
+    Todo se serializa antes de crear archivos, así un fallo no deja snapshots incompletos.
+    Raises:
+        TypeError: Si el reporte contiene valores que no se pueden serializar.
+        OSError: Si no se puede escribir en DIRECTORIO_SNAPSHOTS.
+    """
+    texto_reporte = _a_json(reporte)
+    texto_filtros = _a_json(filtros)
+    version_nueva = not _directorio_version().exists()
+    directorio = _directorio_archivo(hash_archivo)
+    directorio.mkdir(parents=True, exist_ok=True)
+    # El reporte se escribe primero: filtros.json solo aparece cuando el snapshot está completo
+    _escribir(directorio / f"{hash_seleccion}.json", texto_reporte)
+    _escribir(directorio / ARCHIVO_FILTROS, texto_filtros)
+    if version_nueva:
+        limpiar_versiones_obsoletas()
+    limpiar_archivos_antiguos()
+
+def limpiar_versiones_obsoletas() -> None:
+    """Elimina los snapshots generados por otras versiones de la app."""
+    for directorio in DIRECTORIO_SNAPSHOTS.iterdir():
+        if directorio.is_dir() and directorio.name != version_app():
+            shutil.rmtree(directorio, ignore_errors=True)
+
+def limpiar_archivos_antiguos() -> None:
+    """Elimina, dentro de la versión actual, los snapshots sin uso reciente o que exceden MAX_ARCHIVOS."""
+    def ultimo_uso(directorio: Path) -> float:
+        try:
+            return (directorio / ARCHIVO_FILTROS).stat().st_mtime
+        except OSError:
+            pass
+        try:
+            # Snapshot incompleto (por ejemplo, de un guardado interrumpido)
+            return directorio.stat().st_mtime
+        except OSError:
+            return 0.0
+    directorios = sorted(
+        (d for d in _directorio_version().iterdir() if d.is_dir()),
+        key=ultimo_uso,
+        reverse=True,
+    )
+    limite = reloj.time() - DIAS_RETENCION * 24 * 3600
+    for posicion, directorio in enumerate(directorios):
+        if posicion >= MAX_ARCHIVOS or ultimo_uso(directorio) < limite:
+            shutil.rmtree(directorio, ignore_errors=True)